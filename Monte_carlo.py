@@ -1,70 +1,208 @@
+import os
+from math import erfc, sqrt
 import numpy as np 
 import matplotlib.pyplot as plt 
 import pandas as pd 
 
+# Optional: Numba JIT for the multithreaded sample-and-count kernel. Opt-in (MC_USE_NUMBA=1)-
+# it only beats the NumPy chunked path with several cores, and costs import + JIT time
+USE_NUMBA = os.getenv('MC_USE_NUMBA') == '1'
+if USE_NUMBA:
+    try:
+        from numba import njit, prange
+    except ImportError:
+        USE_NUMBA = False
+
+# Optional: numexpr for a multithreaded, vectorized Box-Muller normal generator. Opt-in
+# (MC_USE_NUMEXPR=1)- on few cores PCG64 standard_normal is faster and allocates nothing
+USE_NUMEXPR = os.getenv('MC_USE_NUMEXPR') == '1'
+if USE_NUMEXPR:
+    try:
+        import numexpr as ne
+    except ImportError:
+        USE_NUMEXPR = False
+
 # Constants
 R_EARTH = 6378.0  # Earth radius in km
 V_ESCAPE = 11.2   # Earth escape velocity in km/s
+Z = 1.96          # z-score for 95% confidence
+Z2 = Z * Z
+SQRT2 = sqrt(2)
+TWO_PI = 6.283185307179586
 
 # NASA orbit uncertainty to position uncertainty (Estimated for the simulation- real prob. less scary) 
-UNCERTAINTY_MAP = {
-    0: 0.01, 1: 0.02, 2: 0.05, 3: 0.10, 4: 0.15,
-    5: 0.20, 6: 0.30, 7: 0.40, 8: 0.50, 9: 0.60
-}
+# Indexed directly by the orbit class (0-9)
+UNCERTAINTY_ARR = np.array([0.01, 0.02, 0.05, 0.10, 0.15, 0.20, 0.30, 0.40, 0.50, 0.60])
+
+# Shared generator for all sampling (PCG64 is much faster than the legacy global MT19937)
+rng = np.random.default_rng()
+
+# Samples generated per pass when only the impact count is needed (fits in L2 as float32)
+CHUNK_SIZE = 65536
+
+# Max trials drawn in the scatter panel, more points add no visible detail
+SCATTER_MAX_POINTS = 5000
+# Min impacts drawn when they are too rare to show up in the uniform subset
+SCATTER_MIN_HITS = 500
+
+def _sample_distances(miss_distance_km, sigma, out):
+    """
+    Fill a float32 buffer with Normal(miss, sigma) miss distances
+    """
+    sigma = np.float32(sigma)
+    miss = np.float32(miss_distance_km)
+
+    if USE_NUMEXPR:
+        # Box-Muller: each uniform pair gives a cosine and a sine normal
+        n = len(out)
+        half = (n + 1) // 2
+        # float64 uniforms: 1 - u1 >= 2**-53 keeps tails out to ~8.6 sigma (float32 cut at ~5.8)
+        u1 = rng.random(half)
+        u2 = rng.random(half)
+        tau = TWO_PI
+        # 1 - u1 lies in (0, 1] so the log is always finite
+        radius = ne.evaluate("sqrt(-2 * log(1 - u1))")
+        ne.evaluate("radius * cos(tau * u2) * sigma + miss", out=out[:half], casting='same_kind')
+        radius, u2 = radius[:n - half], u2[:n - half]
+        ne.evaluate("radius * sin(tau * u2) * sigma + miss", out=out[half:], casting='same_kind')
+    else:
+        rng.standard_normal(len(out), dtype=np.float32, out=out)
+        np.multiply(out, sigma, out=out)
+        np.add(out, miss, out=out)
+
+    return out
+
+def _count_impacts(miss_distance_km, sigma, r_critical, n_trials):
+    """
+    Sample, compare and count in fixed-size chunks without keeping the samples
+    """
+    buf = np.empty(min(CHUNK_SIZE, n_trials), dtype=np.float32)
+    r_critical = np.float32(r_critical)  # a float64 scalar would upcast every compare
+    impacts = 0
+
+    for start in range(0, n_trials, CHUNK_SIZE):
+        chunk = buf[:min(CHUNK_SIZE, n_trials - start)]
+        _sample_distances(miss_distance_km, sigma, chunk)
+        impacts += np.count_nonzero(chunk < r_critical)
+
+    return impacts
+
+if USE_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _mc_kernel(miss_distance_km, sigma, r_critical, n_trials, seed):
+        """
+        Parallel sample-and-count over CHUNK_SIZE blocks, each block reseeds its
+        thread's Numba RNG from the seed so counts don't depend on the thread count
+        """
+        n_blocks = (n_trials + CHUNK_SIZE - 1) // CHUNK_SIZE
+        impacts = 0
+        for block in prange(n_blocks):
+            np.random.seed(seed + block)
+            stop = min(CHUNK_SIZE, n_trials - block * CHUNK_SIZE)
+            block_impacts = 0
+            for _ in range(stop):
+                if miss_distance_km + sigma * np.random.standard_normal() < r_critical:
+                    block_impacts += 1
+            impacts += block_impacts
+        return impacts
+
+def _binomial_stats(impact_count, n_trials):
+    """
+    Point estimate, 95% Wilson score interval and standard error for a hit count
+    """
+    n = int(n_trials)
+    inv_n = 1.0 / n
+    p_hat = impact_count * inv_n
 
-def impact_simulation(miss_distance_km, velocity_km_s, orbit_uncertainty, n_trials=100000):
+    denominator = 1 + Z2*inv_n
+    center = (p_hat + 0.5*Z2*inv_n) / denominator
+    margin = Z * sqrt(p_hat*(1-p_hat)*inv_n + 0.25*Z2*inv_n*inv_n) / denominator
+
+    std_error = sqrt(p_hat * (1 - p_hat) * inv_n)
+    return p_hat, (max(0, center - margin), min(1, center + margin)), std_error
+
+def _precompute(velocity_km_s, orbit_uncertainty):
+    """
+    Per-asteroid invariants: critical radius and position uncertainty fraction
     """
-    Simple Monte Carlo impact probability calculator
+    # Get uncertainty percentage from orbit class- int() takes the API's str or an int,
+    # out-of-range classes clamp to the nearest end of the scale.
+    # orbit_uncertainty is nullable in raw.neo_data, a missing class (None/NaN) falls back to 10%
+    if orbit_uncertainty is None or orbit_uncertainty != orbit_uncertainty:
+        uncertainty = 0.10
+    else:
+        idx = max(0, min(len(UNCERTAINTY_ARR) - 1, int(orbit_uncertainty)))
+        uncertainty = float(UNCERTAINTY_ARR[idx])
+
+    # Earth's effective radius with gravitational focusing
+    r_critical = R_EARTH * np.sqrt(1 + (V_ESCAPE**2 / velocity_km_s**2))
+    return r_critical, uncertainty
+
+def _run(miss_distance_km, sigma, r_critical, n_trials, return_samples=False):
+    """
+    Run the Monte Carlo trials, returns the impact count (and samples if requested)
+    """
+    if return_samples:
+        sampled_distances = _sample_distances(miss_distance_km, sigma,
+                                              np.empty(n_trials, dtype=np.float32))
+        hits = np.count_nonzero(sampled_distances < np.float32(r_critical))
+        return hits, {'sampled_distances': sampled_distances, 'impact_count': hits}
+    if USE_NUMBA:
+        # Seed drawn from the shared generator, so seeding rng also fixes the kernel's draws
+        seed = int(rng.integers(2**31))
+        return _mc_kernel(float(miss_distance_km), float(sigma), float(r_critical), n_trials, seed), {}
+    return _count_impacts(miss_distance_km, sigma, r_critical, n_trials), {}
+
+def impact_simulation(miss_distance_km, velocity_km_s, orbit_uncertainty, n_trials=100000,
+                      return_samples=False, method='analytic'):
+    """
+    Impact probability calculator- exact normal CDF by default, Monte Carlo on request
     
     Args:
         miss_distance_km: Miss distance from API
         velocity_km_s: Relative velocity from API
         orbit_uncertainty: Orbit uncertainty (0-9) from API
-        n_trials: Number of simulations (default 100k)
+        n_trials: Number of simulations (default 100k), only used with method='mc'
+        return_samples: Keep the sampled distances (needed for plotting), requires method='mc'
+        method: 'analytic' (default) for the exact normal CDF, 'mc' to run the Monte Carlo trials
     
     Returns:
         Impact probability (0 to 1)
     """
-    # Get uncertainty percentage from orbit class
-    if isinstance(orbit_uncertainty, str):
-        orbit_uncertainty = int(orbit_uncertainty)
-    uncertainty = UNCERTAINTY_MAP.get(orbit_uncertainty, 0.10)
- 
-    # Earth's effective radius with gravitational focusing
-    r_critical = R_EARTH * np.sqrt(1 + (V_ESCAPE**2 / velocity_km_s**2))
-    
-    # Run simulation: sample miss distances
+    if method not in ('analytic', 'mc'):
+        raise ValueError(f"Unknown method '{method}', expected 'analytic' or 'mc'")
+    if return_samples and method != 'mc':
+        raise ValueError("return_samples requires method='mc'")
+
+    r_critical, uncertainty = _precompute(velocity_km_s, orbit_uncertainty)
     sigma = miss_distance_km * uncertainty
-    sampled_distances = np.random.normal(miss_distance_km, sigma, n_trials)
-    impacts = sampled_distances < r_critical
-    probability = np.sum(impacts) / n_trials
-
-    # STATS
-    # Wilson score interval for binomial proportion
-    z = 1.96  
-    p_hat = probability
-    n = n_trials
-    
-    denominator = 1 + z**2/n
-    center = (p_hat + z**2/(2*n)) / denominator
-    margin = z * np.sqrt((p_hat*(1-p_hat)/n + z**2/(4*n**2))) / denominator
-    
-    ci_lower = max(0, center - margin)
-    ci_upper = min(1, center + margin)
-    
-    std_error = np.sqrt(probability * (1 - probability) / n_trials)
+    samples = {}
+
+    if method == 'analytic':
+        # P(X < r_critical) with X ~ Normal(miss, sigma) is the normal CDF- no sampling error
+        # erfc form of 0.5*(1+erf(...)) keeps precision for the tiny tail probabilities
+        probability = 0.5 * erfc((miss_distance_km - r_critical) / (sigma * SQRT2))
+        # Exact value- no sampling interval or error
+        ci_lower = ci_upper = probability
+        std_error = 0.0
+        relative_error = 0.0
+    else:
+        # Run simulation: sample miss distances
+        impact_count, samples = _run(miss_distance_km, sigma, r_critical, n_trials, return_samples)
+
+        probability, (ci_lower, ci_upper), std_error = _binomial_stats(impact_count, n_trials)
+        relative_error = std_error / probability if probability > 0 else np.inf
     
     return probability, {
-        'sampled_distances': sampled_distances,
+        **samples,
         'r_critical': r_critical,
-        'impacts': impacts,
         'nominal_miss': miss_distance_km,
         'sigma': sigma,
         'orbit_uncertainty': orbit_uncertainty,
         'uncertainty_percent': uncertainty * 100,
         'confidence_interval_95': (ci_lower, ci_upper),
         'standard_error': std_error,
-        'relative_error': std_error / probability if probability > 0 else np.inf
+        'relative_error': relative_error
     }
 
 def convergence_analysis(miss_distance_km, velocity_km_s, orbit_uncertainty, 
@@ -73,11 +211,24 @@ def convergence_analysis(miss_distance_km, velocity_km_s, orbit_uncertainty,
     Demonstrate Monte Carlo convergence and optimal sample size
     """
     results = []
+    r_critical, uncertainty = _precompute(velocity_km_s, orbit_uncertainty)
+    sigma = miss_distance_km * uncertainty
+    
+    # Draw the largest run once- each smaller size is a prefix of it, so only the new
+    # segment is compared and the hit count carries over
+    trial_sizes = sorted(trial_sizes)
+    if not trial_sizes:
+        return pd.DataFrame(results)
+    samples = _sample_distances(miss_distance_km, sigma,
+                                np.empty(trial_sizes[-1], dtype=np.float32))
+    r_critical32 = np.float32(r_critical)
+    impact_count = 0
+    start = 0
     
     for n in trial_sizes:
-        prob, _ = impact_simulation(miss_distance_km, velocity_km_s, 
-                                    orbit_uncertainty, n_trials=n)
-        results.append({'n_trials': n, 'probability': prob})
+        impact_count += np.count_nonzero(samples[start:n] < r_critical32)
+        start = n
+        results.append({'n_trials': n, 'probability': impact_count / n})
     
     return pd.DataFrame(results)
 
@@ -115,7 +266,8 @@ def plot_convergence(miss_distance_km, velocity_km_s, orbit_uncertainty,
     ax1.legend(fontsize=10)
     ax1.grid(True, alpha=0.3, linestyle='--')
     
-    textstr = f'Stabilized at ~{trial_sizes[-2]:,} trials\nFinal: {final_prob:.3e}'
+    # Sizes come back sorted from convergence_analysis, the caller's list may not be
+    textstr = f'Stabilized at ~{df["n_trials"].iloc[-2]:,} trials\nFinal: {final_prob:.3e}'
     ax1.text(0.02, 0.98, textstr, transform=ax1.transAxes, 
              fontsize=9, verticalalignment='top',
              bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.6))
@@ -154,11 +306,11 @@ def plot_results3(probability, data, asteroid_name="Asteroid"):
     distances = data['sampled_distances']
     r_critical = data['r_critical']
     nominal = data['nominal_miss']
-    impacts = data['impacts']
     sigma = data['sigma']
 
-    impact_count = np.sum(impacts)
-    miss_count = len(impacts) - impact_count
+    impact_count = data['impact_count']
+    n_trials = len(distances)
+    miss_count = n_trials - impact_count
 
     plt.style.use('dark_background')
     
@@ -207,11 +359,11 @@ def plot_results3(probability, data, asteroid_name="Asteroid"):
         alpha=0.7, edgecolor='white', color='#4a9eff', linewidth=0.5
     )
 
-    # Color bins that fall below the critical radius
-    for i, patch in enumerate(patches):
-        if bins[i] < r_critical:
-            patch.set_facecolor('#ff4444')
-            patch.set_alpha(0.8)
+    # Color bins that fall below the critical radius (left edges are sorted, so it's a prefix)
+    cut = np.searchsorted(bins[:-1], r_critical)
+    for patch in patches[:cut]:
+        patch.set_facecolor('#ff4444')
+        patch.set_alpha(0.8)
 
     axHist.axvline(
         r_critical, color='#ff6666', linestyle='--', linewidth=2.5,
@@ -237,15 +389,41 @@ def plot_results3(probability, data, asteroid_name="Asteroid"):
         spine.set_edgecolor(text_color)
 
     # PLOT 3 — SCATTER (BOTTOM LEFT)
-    trial_numbers = np.arange(len(distances))
-    colors_scatter = ['#ff4444' if imp else '#44ff44' for imp in impacts]
+    # Draw a random subset of trials- the histogram and counts still use all of them
+    # The drawn indices are the trial numbers, so no full-length arange is needed
+    shown = rng.choice(n_trials, size=min(SCATTER_MAX_POINTS, n_trials), replace=False)
+    # Only the drawn trials are compared- no full-length impact mask is kept
+    r_critical32 = np.float32(r_critical)
+    shown_hits = distances[shown] < r_critical32
+    miss_idx = shown[~shown_hits]
+    hit_idx = shown[shown_hits]
+    sample_ratio = f"1:{n_trials / len(shown):,.0f}" if len(shown) < n_trials else "all"
+
+    # Rare impacts vanish from a uniform sample- top them up to SCATTER_MIN_HITS and say so
+    hit_target = min(impact_count, SCATTER_MIN_HITS)
+    if len(hit_idx) < hit_target:
+        hit_idx = rng.choice(np.flatnonzero(distances < r_critical32), size=hit_target, replace=False)
+        shown_of = 'all' if hit_target == impact_count else f'{hit_target:,} of'
+        hit_label = f'Impacts: {shown_of} {impact_count:,} (oversampled)'
+    else:
+        hit_label = f'Impacts: {sample_ratio}'
 
+    # One single-color collection per outcome instead of a per-point color list
+    axScatt.scatter(
+        miss_idx,
+        distances[miss_idx],
+        c='#44ff44',
+        alpha=0.3,
+        s=1,
+        label=f'Misses: {sample_ratio}'
+    )
     axScatt.scatter(
-        trial_numbers,
-        distances,
-        c=colors_scatter,
+        hit_idx,
+        distances[hit_idx],
+        c='#ff4444',
         alpha=0.3,
-        s=1
+        s=1,
+        label=hit_label
     )
     axScatt.axhline(
         r_critical,
@@ -267,7 +445,12 @@ def plot_results3(probability, data, asteroid_name="Asteroid"):
     # SUMMARY BOX 
     ci_lower, ci_upper = data['confidence_interval_95']
     # Saftey Margin calc
-    closest_sampled = np.min(distances)
+    # Each stat computed once and reused below (min doubles as the closest approach)
+    closest_sampled = distances.min()
+    max_dist = distances.max()
+    median_dist = np.median(distances)
+    mean_dist = distances.mean()
+    std_dist = distances.std()
     safety_margin = closest_sampled - r_critical
     if safety_margin < 0:
         safety_status = f"X BREACH: {abs(safety_margin):,.0f} km"
@@ -292,7 +475,7 @@ def plot_results3(probability, data, asteroid_name="Asteroid"):
                          {ci_upper:.8f}]
     Standard Error:     {data['standard_error']:.8f}
     
-    Impacts:            {impact_count:,} / {len(impacts):,}
+    Impacts:            {impact_count:,} / {n_trials:,}
 
     ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     INPUT DATA
@@ -314,17 +497,17 @@ def plot_results3(probability, data, asteroid_name="Asteroid"):
     SIMULATION STATISTICS
     ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-    Min Distance:   {np.min(distances):,.0f} km
-    Max Distance:   {np.max(distances):,.0f} km
-    Mean Distance:  {np.mean(distances):,.0f} km
-    Median:         {np.median(distances):,.0f} km
-    Std Dev:        {np.std(distances):,.0f} km
+    Min Distance:   {closest_sampled:,.0f} km
+    Max Distance:   {max_dist:,.0f} km
+    Mean Distance:  {mean_dist:,.0f} km
+    Median:         {median_dist:,.0f} km
+    Std Dev:        {std_dist:,.0f} km
     
     ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     MONTE CARLO DETAILS
     ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     
-    Total Trials:       {len(impacts):,}
+    Total Trials:       {n_trials:,}
     Method:             Normal Distribution
     Sampling:           Random (NumPy)
     
@@ -375,6 +558,13 @@ def plot_results3(probability, data, asteroid_name="Asteroid"):
     print(f"Graph saved as: {asteroid_name.replace(' ', '_')}_impact_analysis.png")
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Monte Carlo asteroid impact examples")
+    parser.add_argument('--plot', action='store_true',
+                        help="Keep the samples and save the analysis/convergence figures")
+    args = parser.parse_args()
+
     api_ex = pd.read_csv('API_real_data_ex.csv')
     top_df = api_ex.iloc[0, :]
 
@@ -388,11 +578,14 @@ if __name__ == "__main__":
         miss_distance_km=top_df['miss_distance_km'],     
         velocity_km_s=top_df['velocity_km_s'],
         orbit_uncertainty=top_df['orbit_uncertainty'],        
-        n_trials=500000
+        n_trials=500000,
+        return_samples=args.plot,
+        method='mc'
     )
     
     print(f"\nImpact Probability: {probability:.8f} ({probability*100:.6f}%)")
-    plot_results3(probability, data, f"{top_df['neo_id']} Asteroid")
+    if args.plot:
+        plot_results3(probability, data, f"{top_df['neo_id']} Asteroid")
 
     # Example 2: Real scary asteroid
     print("="*60)
@@ -404,21 +597,28 @@ if __name__ == "__main__":
         miss_distance_km= 31600,     
         velocity_km_s=7.4,
         orbit_uncertainty=4,        
-        n_trials=500000
+        n_trials=500000,
+        return_samples=args.plot,
+        method='mc'
     )
     
     print(f"\nImpact Probability: {probability:.8f} ({probability*100:.6f}%)")
-    plot_results3(probability, data, f"99942 Apophis (Expected 2029)")
+    if args.plot:
+        plot_results3(probability, data, f"99942 Apophis (Expected 2029)")
 
-    # Generate convergence analysis plot for an assumed terrible case
+    # Generate convergence analysis (and plot) for an assumed terrible case
     print("\nRunning convergence analysis...")
-    convergence_df = plot_convergence(
+    convergence_args = dict(
         miss_distance_km= 27500,     
         velocity_km_s=9.2,
         orbit_uncertainty=5,        
-        trial_sizes=[100, 1000, 10000, 100000, 500000, 1000000],
-        asteroid_name="Fake Asteroid for Impact Data"
+        trial_sizes=[100, 1000, 10000, 100000, 500000, 1000000]
     )
+    if args.plot:
+        convergence_df = plot_convergence(**convergence_args,
+                                          asteroid_name="Fake Asteroid for Impact Data")
+    else:
+        convergence_df = convergence_analysis(**convergence_args)
     
     print("\nConvergence Results:")
     print(convergence_df.to_string(index=False))
@@ -1,9 +1,14 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
 
 API_KEY = os.getenv('API_KEY')
 
+# Shared session so repeated calls reuse pooled keep-alive connections (sized for the fetch threads)
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
 def fetch_data():
 
     end_date = datetime.now()
@@ -16,7 +21,7 @@ def fetch_data():
     API_URL = f"https://api.nasa.gov/neo/rest/v1/feed?start_date={start_date_str}&end_date={end_date_str}&api_key={API_KEY}"
 
     try:
-        response = requests.get(API_URL)
+        response = _session.get(API_URL)
         response.raise_for_status()
         print("Inital API response received successfully.")
         return response.json()
@@ -35,7 +40,7 @@ def fetch_orbital_data(asteroid_id):
     API_URL2 = f"https://api.nasa.gov/neo/rest/v1/neo/{asteroid_id}?api_key={API_KEY}"
 
     try:
-        response = requests.get(API_URL2)
+        response = _session.get(API_URL2)
         response.raise_for_status()
         # time.sleep(0.1) # for rate limiting
         return response.json()
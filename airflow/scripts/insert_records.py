@@ -1,10 +1,13 @@
 import os
 import psycopg2
+from psycopg2.extras import execute_values
+from concurrent.futures import ThreadPoolExecutor
 from api_request import fetch_data, fetch_orbital_data
 
 POSTGRES_DB = os.getenv('POSTGRES_DB')
 POSTGRES_USER = os.getenv('POSTGRES_USER')
 POSTGRES_PASSWORD = os.getenv('POSTGRES_PASSWORD')
+FETCH_WORKERS = 16 # concurrent orbital data requests
 
 def connect_to_db():
     print("Connecting to the PostgreSQL database...")
@@ -46,7 +49,7 @@ def insert_records(conn, orbital_responses):
     print("Inserting data into database.")
     try:
         cursor = conn.cursor()
-        inserted_count = 0
+        rows = []
 
         for i, resp in enumerate(orbital_responses, 1):
             neo_id = resp.get('id')
@@ -65,36 +68,33 @@ def insert_records(conn, orbital_responses):
             velocity_km_s = close_approach.get('relative_velocity', {}).get('kilometers_per_second')
             orbital_data = resp.get('orbital_data', {})
             orbit_uncertainty = orbital_data.get('orbit_uncertainty')
-            
-            # Insert into database- handles if id exists 
-            try:
-                cursor.execute("""
-                    INSERT INTO raw.neo_data (
-                        neo_id,
-                        miss_distance_km,
-                        velocity_km_s,
-                        orbit_uncertainty,
-                        is_potentially_hazardous
-                    ) VALUES (%s, %s, %s, %s, %s)
-                    ON CONFLICT (neo_id) 
-                    DO UPDATE SET
-                        miss_distance_km = EXCLUDED.miss_distance_km,
-                        velocity_km_s = EXCLUDED.velocity_km_s,
-                        orbit_uncertainty = EXCLUDED.orbit_uncertainty,
-                        is_potentially_hazardous = EXCLUDED.is_potentially_hazardous,
-                        inserted_at = NOW()
-                """, (
-                    neo_id,
-                    float(miss_distance_km) if miss_distance_km else None,
-                    float(velocity_km_s) if velocity_km_s else None,
-                    orbit_uncertainty,
-                    is_hazardous
-                ))
-                inserted_count += 1
-                
-            except psycopg2.Error as e:
-                print(f"\nError inserting record {neo_id}: {e}")
-                continue
+
+            rows.append((
+                neo_id,
+                float(miss_distance_km) if miss_distance_km else None,
+                float(velocity_km_s) if velocity_km_s else None,
+                orbit_uncertainty,
+                is_hazardous
+            ))
+
+        # Insert all rows in one multi-row statement- handles if id exists
+        execute_values(cursor, """
+            INSERT INTO raw.neo_data (
+                neo_id,
+                miss_distance_km,
+                velocity_km_s,
+                orbit_uncertainty,
+                is_potentially_hazardous
+            ) VALUES %s
+            ON CONFLICT (neo_id) 
+            DO UPDATE SET
+                miss_distance_km = EXCLUDED.miss_distance_km,
+                velocity_km_s = EXCLUDED.velocity_km_s,
+                orbit_uncertainty = EXCLUDED.orbit_uncertainty,
+                is_potentially_hazardous = EXCLUDED.is_potentially_hazardous,
+                inserted_at = NOW()
+        """, rows, page_size=500)
+        inserted_count = len(rows)
         
         conn.commit()
         print(f"\nSuccessfully inserted/updated {inserted_count} records.")
@@ -111,17 +111,17 @@ def main():
         base_data = fetch_data()
 
         # Get all unique id's for search API
-        asteroid_ids = set() # set enforces no dups and order doesn't matter here, also O(n)
-        for date, a_ids in base_data['near_earth_objects'].items():
-            for id in a_ids:
-                asteroid_ids.add(id['id'])
+        asteroid_ids = { # set enforces no dups and order doesn't matter here, also O(n)
+            neo['id'] for neos in base_data['near_earth_objects'].values() for neo in neos
+        }
         
         print(f"Fetching orbital data for {len(asteroid_ids)} asteroids...")
-        orbital_responses = []
-        for i, n_id in enumerate(asteroid_ids, 1):
-            orb_resp = fetch_orbital_data(n_id)
-            if orb_resp:
-                orbital_responses.append(orb_resp)
+        # Requests are latency bound, so overlap them across threads
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+            orbital_responses = [
+                orb_resp for orb_resp in executor.map(fetch_orbital_data, asteroid_ids)
+                if orb_resp
+            ]
 
         print(f"\nCollected {len(orbital_responses)} orbital responses.")
         